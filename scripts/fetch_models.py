@@ -9,6 +9,40 @@ import urllib.request
 
 DEFAULT_MANIFEST = os.path.join(os.path.dirname(__file__), "..", "models_manifest.json")
 
+# Quantization types ordered from lowest to highest quality.
+QUANT_ORDER = [
+    "IQ1_S",
+    "IQ1_M",
+    "IQ2_XXS",
+    "IQ2_XS",
+    "IQ2_S",
+    "IQ2_M",
+    "Q2_K",
+    "IQ3_XXS",
+    "IQ3_XS",
+    "Q3_K_S",
+    "IQ3_S",
+    "IQ3_M",
+    "Q3_K_M",
+    "Q3_K_L",
+    "IQ4_XS",
+    "IQ4_NL",
+    "Q4_0",
+    "Q4_K_S",
+    "Q4_K_M",
+    "Q5_0",
+    "Q5_K_S",
+    "Q5_K_M",
+    "Q6_K",
+    "Q8_0",
+    "F16",
+]
+
+# Headroom reserved for the OS, the backend process and the KV cache when a
+# variant has no measured `ram_gb`.
+RAM_OVERHEAD_GB = 0.5
+RAM_USABLE_FRACTION = 0.8
+
 
 def load_manifest(path):
     with open(path, "r", encoding="utf-8") as handle:
@@ -34,6 +68,97 @@ def list_models(models):
     for model in models:
         optional = "optional" if model.get("optional") else "required"
         print(f"{model['id']} | tier {model['tier']} | {optional} | {model['name']}")
+        for variant in model.get("variants") or []:
+            ram = variant.get("ram_gb")
+            tps = variant.get("tokens_per_sec")
+            ram_text = f"{ram}GB RAM" if ram is not None else "RAM n/a"
+            tps_text = f"{tps} tok/s" if tps is not None else "tok/s n/a"
+            print(f"    {variant['quant']} | {variant.get('size_gb')}GB | {ram_text} | {tps_text}")
+
+
+def quant_rank(quant):
+    try:
+        return QUANT_ORDER.index((quant or "").upper())
+    except ValueError:
+        return -1
+
+
+def detect_ram_gb():
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024 ** 3)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def estimated_ram_gb(variant):
+    if variant.get("ram_gb") is not None:
+        return variant["ram_gb"]
+    if variant.get("size_gb") is not None:
+        return variant["size_gb"] + RAM_OVERHEAD_GB
+    return None
+
+
+def choose_variant(entry, quant=None, ram_gb=None, min_tps=None):
+    """Return the manifest entry with the best-fitting variant applied.
+
+    An explicit `quant` wins. Otherwise the highest-quality variant whose
+    (measured or estimated) RAM fits in `ram_gb` is chosen, skipping variants
+    with a measured `tokens_per_sec` below `min_tps` and locally produced
+    (`local`) variants. If nothing fits, the smallest variant is used.
+    Entries without `variants` are returned as-is. Returns None when `quant`
+    is given but the entry does not offer it.
+    """
+    variants = entry.get("variants") or []
+    if not variants:
+        if quant and (entry.get("quant") or "").upper() != quant.upper():
+            return None
+        return entry
+
+    chosen = None
+    if quant:
+        for variant in variants:
+            if variant.get("local"):
+                continue
+            if variant.get("quant", "").upper() == quant.upper():
+                chosen = variant
+                break
+        if chosen is None:
+            return None
+    else:
+        budget = ram_gb * RAM_USABLE_FRACTION if ram_gb else None
+        candidates = []
+        for variant in variants:
+            if variant.get("local"):
+                continue
+            needed = estimated_ram_gb(variant)
+            if budget is not None and needed is not None and needed > budget:
+                continue
+            tps = variant.get("tokens_per_sec")
+            if min_tps is not None and tps is not None and tps < min_tps:
+                continue
+            candidates.append(variant)
+        if candidates:
+            chosen = max(candidates, key=lambda v: quant_rank(v.get("quant")))
+        else:
+            downloadable = [v for v in variants if not v.get("local")] or variants
+            chosen = min(downloadable, key=lambda v: estimated_ram_gb(v) or 0)
+
+    resolved = dict(entry)
+    if chosen.get("file") != entry.get("file"):
+        # Entry-level URL overrides point at the default file only.
+        resolved.pop("url", None)
+        resolved.pop("urls", None)
+    for key in ("quant", "file", "size_gb", "ram_gb", "tokens_per_sec", "sha256", "url", "urls"):
+        if key in chosen:
+            resolved[key] = chosen[key]
+    return resolved
 
 
 def select_models(models, tiers=None, model_ids=None, include_optional=False):
@@ -88,6 +213,9 @@ def main():
     parser.add_argument("--model", action="append", help="Model id to download (repeatable)")
     parser.add_argument("--include-optional", action="store_true", help="Include optional models")
     parser.add_argument("--force", action="store_true", help="Re-download even if file exists")
+    parser.add_argument("--quant", help="Quantization variant to download (e.g. Q3_K_M); default picks by RAM")
+    parser.add_argument("--ram-gb", type=float, help="Target device RAM in GB (default: detect this machine)")
+    parser.add_argument("--min-tps", type=float, help="Skip variants with measured tokens/sec below this")
 
     args = parser.parse_args()
 
@@ -106,9 +234,17 @@ def main():
         print("No models selected. Use --list to see options.")
         return 1
 
+    ram_gb = args.ram_gb if args.ram_gb is not None else detect_ram_gb()
+    if not args.quant and ram_gb:
+        print(f"Selecting variants for {ram_gb:.1f}GB RAM")
+
     os.makedirs(args.dest, exist_ok=True)
 
-    for entry in selected:
+    for model in selected:
+        entry = choose_variant(model, quant=args.quant, ram_gb=ram_gb, min_tps=args.min_tps)
+        if entry is None:
+            print(f"Skipping {model['id']}: no {args.quant} variant in manifest")
+            continue
         urls = get_urls(entry)
         if not urls:
             print(f"Skipping {entry['id']}: missing url/repo/file")
@@ -118,7 +254,8 @@ def main():
         if os.path.exists(dest_path) and not args.force:
             print(f"Skipping {entry['id']} (exists): {dest_path}")
             continue
-        print(f"Downloading {entry['id']} -> {dest_path}")
+        quant = f" ({entry['quant']})" if entry.get("quant") else ""
+        print(f"Downloading {entry['id']}{quant} -> {dest_path}")
         downloaded = False
         last_error = None
         for url in urls:
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+from fetch_models import quant_rank
+
+
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(__file__), "..", "models_manifest.json")
+BENCH_PROMPT = "Explain how to purify drinking water without electricity."
+LOCAL_SUFFIX = "-local"
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def save_manifest(path, data):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, indent=2)
+        handle.write("\n")
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_entry(models, model_id):
+    for entry in models:
+        if entry.get("id") == model_id:
+            return entry
+    return None
+
+
+def local_variants(entry, models_dir):
+    """Return (variant, path) pairs for files of this entry present in `models_dir`.
+
+    If the entry's own `file` is present but has no variant record, one is
+    added, copied from the entry, so measurements have somewhere to live.
+    """
+    variants = entry.setdefault("variants", [])
+    filename = entry.get("file")
+    if (
+        filename
+        and filename not in [v.get("file") for v in variants]
+        and os.path.exists(os.path.join(models_dir, filename))
+    ):
+        variants.append(
+            {
+                "quant": entry.get("quant"),
+                "file": entry["file"],
+                "size_gb": entry.get("size_gb"),
+                "ram_gb": None,
+                "tokens_per_sec": None,
+                "sha256": entry.get("sha256"),
+            }
+        )
+    found = []
+    for variant in variants:
+        filename = variant.get("file")
+        if not filename:
+            continue
+        path = os.path.join(models_dir, filename)
+        if os.path.exists(path):
+            found.append((variant, path))
+    return found
+
+
+def find_quantize_bin(explicit=None):
+    candidates = [explicit, os.getenv("LLAMA_QUANTIZE"), "llama-quantize", "quantize"]
+    for candidate in candidates:
+        if not candidate:
+            continue
+        resolved = shutil.which(candidate)
+        if resolved:
+            return resolved
+    return None
+
+
+def output_filename(source_file, source_quant, target_quant):
+    """Name a locally produced file so it can never collide with an upstream one."""
+    base = os.path.basename(source_file)
+    stem, ext = os.path.splitext(base)
+    if stem.endswith(LOCAL_SUFFIX):
+        stem = stem[: -len(LOCAL_SUFFIX)]
+    if source_quant and source_quant in stem:
+        stem = stem.replace(source_quant, target_quant)
+    else:
+        stem = f"{stem}.{target_quant}"
+    return f"{stem}{LOCAL_SUFFIX}{ext or '.gguf'}"
+
+
+def upsert_local_variant(entry, quant):
+    """Return the `local` variant record for `quant`, creating it if needed.
+
+    Upstream variants are never touched: their `file`, `sha256` and
+    `size_gb` describe the published download.
+    """
+    variants = entry.setdefault("variants", [])
+    for variant in variants:
+        if variant.get("local") and variant.get("quant", "").upper() == quant.upper():
+            return variant
+    variant = {
+        "quant": quant,
+        "file": None,
+        "size_gb": None,
+        "ram_gb": None,
+        "tokens_per_sec": None,
+        "sha256": None,
+        "local": True,
+    }
+    variants.append(variant)
+    # Stable sort keeps the upstream record ahead of the local one for a quant.
+    variants.sort(key=lambda v: quant_rank(v.get("quant")))
+    return variant
+
+
+def requantize(quantize_bin, source_path, dest_path, quant, threads=None):
+    cmd = [quantize_bin, "--allow-requantize", source_path, dest_path, quant]
+    if threads:
+        cmd.append(str(threads))
+    print("Running: " + " ".join(cmd))
+    subprocess.run(cmd, check=True)
+
+
+def bench_worker(path, threads, n_ctx, tokens):
+    """Load one GGUF, decode `tokens` tokens and print the measurements as JSON.
+
+    `tokens_per_sec` is decode speed only; prompt evaluation is reported
+    separately as `prompt_eval_ms`. Runs in its own process so peak RSS
+    reflects a single model.
+    """
+    import resource
+
+    import llama_cpp  # type: ignore
+    from llama_cpp import Llama  # type: ignore
+
+    start = time.perf_counter()
+    llama = Llama(model_path=path, n_ctx=n_ctx, n_threads=threads, verbose=False)
+    load_seconds = time.perf_counter() - start
+
+    # Stream so prompt evaluation (up to the first token) and decode are timed apart.
+    start = time.perf_counter()
+    first_token_at = None
+    generated = 0
+    for _ in llama(BENCH_PROMPT, max_tokens=tokens, temperature=0.0, stream=True):
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        generated += 1
+    end = time.perf_counter()
+    prompt_eval_ms = (first_token_at - start) * 1000 if first_token_at else None
+    decode_seconds = end - first_token_at if first_token_at else 0
+    tokens_per_sec = (generated - 1) / decode_seconds if generated > 1 and decode_seconds > 0 else None
+    try:
+        # Prefer llama.cpp's own counters when the bindings expose them.
+        perf = llama_cpp.llama_perf_context(llama._ctx.ctx)
+        if perf.t_eval_ms > 0:
+            tokens_per_sec = perf.n_eval / (perf.t_eval_ms / 1000)
+            prompt_eval_ms = perf.t_p_eval_ms
+    except Exception:
+        pass
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss_bytes = max_rss if sys.platform == "darwin" else max_rss * 1024
+    print(
+        json.dumps(
+            {
+                "ram_gb": round(rss_bytes / (1024 ** 3), 2),
+                "tokens_per_sec": round(tokens_per_sec, 1) if tokens_per_sec else None,
+                "prompt_eval_ms": round(prompt_eval_ms, 1) if prompt_eval_ms is not None else None,
+                "load_seconds": round(load_seconds, 1),
+            }
+        )
+    )
+    return 0
+
+
+def benchmark(path, threads, n_ctx, tokens):
+    cmd = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--bench-file",
+        path,
+        "--threads",
+        str(threads),
+        "--n-ctx",
+        str(n_ctx),
+        "--bench-tokens",
+        str(tokens),
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr.strip())
+        return None
+    lines = result.stdout.strip().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def record_file(variant, path):
+    variant["file"] = os.path.basename(path)
+    variant["size_gb"] = round(os.path.getsize(path) / (1024 ** 3), 2)
+    variant["sha256"] = sha256_file(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Requantize local GGUF models offline and record benchmarks in the manifest"
+    )
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Path to models manifest JSON")
+    parser.add_argument("--models-dir", default="models", help="Directory containing GGUF files")
+    parser.add_argument("--model", help="Model id to requantize or benchmark")
+    parser.add_argument("--quant", action="append", help="Target quantization type (repeatable)")
+    parser.add_argument("--source", help="Source GGUF (default: highest-quality local variant)")
+    parser.add_argument("--quantize-bin", help="Path to llama.cpp llama-quantize (or set LLAMA_QUANTIZE)")
+    parser.add_argument("--force", action="store_true", help="Overwrite existing output files")
+    parser.add_argument("--benchmark", action="store_true", help="Measure RAM and tokens/sec and record them")
+    parser.add_argument("--benchmark-only", action="store_true", help="Benchmark local variants without quantizing")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("MODEL_THREADS") or 4), help="Benchmark threads")
+    parser.add_argument("--n-ctx", type=int, default=int(os.getenv("MODEL_N_CTX") or 2048), help="Benchmark context")
+    parser.add_argument("--bench-tokens", type=int, default=64, help="Tokens to decode per benchmark")
+    parser.add_argument("--bench-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.bench_file:
+        return bench_worker(args.bench_file, args.threads, args.n_ctx, args.bench_tokens)
+
+    if not args.model:
+        print("--model is required.")
+        return 1
+
+    manifest = load_manifest(args.manifest)
+    entry = find_entry(manifest.get("models", []), args.model)
+    if entry is None:
+        print(f"Unknown model id: {args.model}")
+        return 1
+
+    available = local_variants(entry, args.models_dir)
+    targets = [quant.upper() for quant in args.quant or []]
+    produced = []
+
+    if not args.benchmark_only:
+        if not targets:
+            print("No --quant given. Use --benchmark-only to benchmark existing files.")
+            return 1
+        quantize_bin = find_quantize_bin(args.quantize_bin)
+        if not quantize_bin:
+            print("llama-quantize not found. Build llama.cpp and pass --quantize-bin or set LLAMA_QUANTIZE.")
+            return 1
+
+        if args.source:
+            source_path = args.source
+            source_quant = next(
+                (v.get("quant") for v, p in available if os.path.abspath(p) == os.path.abspath(source_path)), None
+            )
+        elif available:
+            source_variant, source_path = max(available, key=lambda item: quant_rank(item[0].get("quant")))
+            source_quant = source_variant.get("quant")
+        else:
+            print(f"No local files for {args.model} in {args.models_dir}. Download or pass --source.")
+            return 1
+        if not os.path.exists(source_path):
+            print(f"Source not found: {source_path}")
+            return 1
+
+        for quant in targets:
+            if source_quant and quant_rank(quant) > quant_rank(source_quant):
+                print(f"Warning: {quant} from {source_quant} cannot recover quality lost in the source.")
+            variant = upsert_local_variant(entry, quant)
+            dest_name = variant.get("file") or output_filename(source_path, source_quant, quant)
+            dest_path = os.path.join(args.models_dir, dest_name)
+            if os.path.exists(dest_path) and not args.force:
+                print(f"Skipping {quant} (exists): {dest_path}")
+            else:
+                try:
+                    requantize(quantize_bin, source_path, dest_path, quant, args.threads)
+                except (OSError, subprocess.CalledProcessError) as exc:
+                    print(f"Quantization to {quant} failed: {exc}")
+                    return 2
+            record_file(variant, dest_path)
+            produced.append((variant, dest_path))
+            print(f"Recorded {args.model} {quant} -> {variant['sha256']}")
+
+    if args.benchmark or args.benchmark_only:
+        to_bench = produced if produced else available
+        if targets:
+            to_bench = [(v, p) for v, p in to_bench if (v.get("quant") or "").upper() in targets]
+        if not to_bench:
+            print("Nothing to benchmark.")
+            return 1
+        for variant, path in to_bench:
+            print(f"Benchmarking {args.model} {variant.get('quant') or ''} ({path})")
+            result = benchmark(path, args.threads, args.n_ctx, args.bench_tokens)
+            if result is None:
+                print(f"Benchmark failed for {path}")
+                continue
+            variant["ram_gb"] = result["ram_gb"]
+            variant["tokens_per_sec"] = result["tokens_per_sec"]
+            variant["benchmark"] = {
+                "prompt_eval_ms": result.get("prompt_eval_ms"),
+                "threads": args.threads,
+                "n_ctx": args.n_ctx,
+                "tokens": args.bench_tokens,
+                "machine": platform.machine(),
+            }
+            print(f"  {result['ram_gb']}GB RAM | {result['tokens_per_sec']} tok/s decode")
+
+    save_manifest(args.manifest, manifest)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -50,15 +50,20 @@ def main():
     for entry in models:
         if not args.all and target_ids and entry.get("id") not in target_ids:
             continue
-        filename = entry.get("file")
-        if not filename:
-            continue
-        path = os.path.join(args.models_dir, filename)
-        if not os.path.exists(path):
-            continue
-        entry["sha256"] = sha256_file(path)
-        updated += 1
-        print(f"Updated {entry.get('id')} -> {entry['sha256']}")
+        checksums = {}
+        for target in [entry] + list(entry.get("variants") or []):
+            filename = target.get("file")
+            if not filename:
+                continue
+            path = os.path.join(args.models_dir, filename)
+            if not os.path.exists(path):
+                continue
+            if filename not in checksums:
+                checksums[filename] = sha256_file(path)
+                updated += 1
+                label = f"{entry.get('id')} {target.get('quant') or ''}".strip()
+                print(f"Updated {label} -> {checksums[filename]}")
+            target["sha256"] = checksums[filename]
 
     if updated == 0:
         print("No checksums updated. Ensure models are downloaded and IDs match.")
@@ -0,0 +1,371 @@
+from typing import Optional, Dict, Any, List, Tuple
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+import asyncio
+import glob
+import json
+import os
+import time
+
+from .model import _env_int, _env_float, get_model
+
+
+LEVELS = ("normal", "reduced", "low")
+DEFAULT_MANIFEST = Path(__file__).resolve().parents[2] / "models_manifest.json"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            return handle.read().strip()
+    except OSError:
+        return None
+
+
+def read_thermal(root: str = "/sys/class/thermal") -> Optional[float]:
+    """Return the hottest thermal zone in °C, or None if no zone is readable."""
+    temps = []
+    for zone in glob.glob(os.path.join(root, "thermal_zone*")):
+        raw = _read(os.path.join(zone, "temp"))
+        try:
+            temps.append(int(raw) / 1000.0)
+        except (TypeError, ValueError):
+            continue
+    return max(temps) if temps else None
+
+
+def read_power(root: str = "/sys/class/power_supply") -> Dict[str, Any]:
+    """Summarize power-supply state: external power presence and lowest battery capacity."""
+    on_battery = False
+    external_online = False
+    capacity = None
+    for supply in glob.glob(os.path.join(root, "*")):
+        kind = (_read(os.path.join(supply, "type")) or "").lower()
+        if kind == "battery":
+            if (_read(os.path.join(supply, "status")) or "").lower() == "discharging":
+                on_battery = True
+            raw = _read(os.path.join(supply, "capacity"))
+            try:
+                value = int(raw)
+            except (TypeError, ValueError):
+                continue
+            capacity = value if capacity is None else min(capacity, value)
+        elif _read(os.path.join(supply, "online")) == "1":
+            external_online = True
+    return {"on_battery": on_battery and not external_online, "battery_capacity": capacity}
+
+
+def _manifest_files(entry: Dict[str, Any]) -> List[Tuple[str, Optional[float]]]:
+    files = []
+    for target in list(entry.get("variants") or []) + [entry]:
+        if target.get("file"):
+            files.append((target["file"], target.get("size_gb")))
+    return files
+
+
+def find_fallback_model(manifest_path: str, model_path: str) -> Optional[str]:
+    """Return a locally available model from a lower manifest tier than `model_path`.
+
+    Looks in the directory of `model_path`, preferring the highest lower tier
+    and, within it, the smallest file.
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as handle:
+            models = json.load(handle).get("models", [])
+    except (OSError, ValueError):
+        return None
+    current = os.path.basename(model_path)
+    base_tier = None
+    for entry in models:
+        if current in [name for name, _ in _manifest_files(entry)]:
+            base_tier = entry.get("tier")
+            break
+    if base_tier is None:
+        return None
+    directory = os.path.dirname(model_path)
+    candidates = []
+    for entry in models:
+        if entry.get("tier") is None or entry["tier"] >= base_tier:
+            continue
+        for name, size_gb in _manifest_files(entry):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                candidates.append((-entry["tier"], size_gb or 0, path))
+    return min(candidates)[2] if candidates else None
+
+
+class ConcurrencyLimiter:
+    """An asyncio semaphore whose limit can be changed at runtime."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.draining = False
+        self._cond = asyncio.Condition()
+        self._tasks = set()
+
+    def set_limit(self, limit: int):
+        self.limit = max(1, limit)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Wake waiters that may now fit under a raised limit. Keep a reference
+        # so the task is not garbage-collected before it runs.
+        task = loop.create_task(self._notify())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self.draining and self.active < self.limit)
+            self.active += 1
+
+    @asynccontextmanager
+    async def exclusive(self):
+        """Block new requests and wait for in-flight ones to finish."""
+        async with self._cond:
+            self.draining = True
+            await self._cond.wait_for(lambda: self.active == 0)
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self.draining = False
+                self._cond.notify_all()
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.release()
+
+
+class Governor:
+    """Thermal- and power-aware runtime governor for inference.
+
+    Polls /sys thermal zones and power supplies every `interval` seconds and
+    picks a level (`normal`, `reduced`, `low`). Each level scales the model
+    thread count and batch size and caps concurrent requests. At `low`, the
+    governor switches to a smaller model from a lower manifest tier if one is
+    present next to the current model, and switches back once pressure eases.
+    A switch first drains the limiter: new requests wait, in-flight ones
+    finish, and the old model is unloaded before the new one is created, so
+    two models are never resident at once. Cooling back down requires
+    dropping `hysteresis` °C below a threshold to avoid flapping.
+    """
+
+    SCALE = {"normal": 1.0, "reduced": 0.5, "low": 0.25}
+
+    def __init__(
+        self,
+        threads: int = 4,
+        n_batch: int = 512,
+        max_concurrency: int = 1,
+        temp_warm: float = 70.0,
+        temp_hot: float = 80.0,
+        hysteresis: float = 5.0,
+        battery_low: int = 30,
+        battery_critical: int = 15,
+        interval: float = 5.0,
+        thermal_root: str = "/sys/class/thermal",
+        power_root: str = "/sys/class/power_supply",
+        manifest_path: str = str(DEFAULT_MANIFEST),
+    ):
+        self.threads = threads
+        self.n_batch = n_batch
+        self.max_concurrency = max_concurrency
+        self.temp_warm = temp_warm
+        self.temp_hot = temp_hot
+        self.hysteresis = hysteresis
+        self.battery_low = battery_low
+        self.battery_critical = battery_critical
+        self.interval = interval
+        self.thermal_root = thermal_root
+        self.power_root = power_root
+        self.manifest_path = manifest_path
+        self.limiter = ConcurrencyLimiter(max_concurrency)
+        self.level = "normal"
+        self.reason = "startup"
+        self.sensors: Dict[str, Any] = {"temperature_c": None, "on_battery": False, "battery_capacity": None}
+        self.settings: Dict[str, Any] = {
+            "n_threads": threads,
+            "n_batch_target": n_batch,
+            "max_concurrency": max_concurrency,
+            "model_path": None,
+        }
+        self.pending_model_path: Optional[str] = None
+        self.decisions_total = 0
+        self.history = deque(maxlen=20)
+        self.last_error: Optional[str] = None
+        self.base_model_path: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def read_sensors(self) -> Dict[str, Any]:
+        sensors = {"temperature_c": read_thermal(self.thermal_root)}
+        sensors.update(read_power(self.power_root))
+        return sensors
+
+    def decide(self, sensors: Dict[str, Any]) -> Tuple[str, str]:
+        # Thresholds relax by `hysteresis` while already at or above a level.
+        current = LEVELS.index(self.level)
+        warm = self.temp_warm - (self.hysteresis if current >= 1 else 0)
+        hot = self.temp_hot - (self.hysteresis if current >= 2 else 0)
+        temp = sensors.get("temperature_c")
+        capacity = sensors.get("battery_capacity")
+        on_battery = sensors.get("on_battery")
+
+        if temp is not None and temp >= hot:
+            return "low", f"temperature {temp:.1f}C >= {hot:.1f}C"
+        if on_battery and capacity is not None and capacity <= self.battery_critical:
+            return "low", f"battery {capacity}% <= {self.battery_critical}%"
+        if temp is not None and temp >= warm:
+            return "reduced", f"temperature {temp:.1f}C >= {warm:.1f}C"
+        if on_battery and capacity is not None and capacity <= self.battery_low:
+            return "reduced", f"battery {capacity}% <= {self.battery_low}%"
+        if on_battery:
+            return "reduced", "on battery"
+        return "normal", "no pressure"
+
+    def settings_for(self, level: str) -> Dict[str, Any]:
+        scale = self.SCALE[level]
+        return {
+            "n_threads": max(1, int(round(self.threads * scale))),
+            "n_batch_target": max(32, int(self.n_batch * scale)),
+            "max_concurrency": 1 if level == "low" else max(1, int(round(self.max_concurrency * scale))),
+        }
+
+    def step(self, state: Any, sensors: Optional[Dict[str, Any]] = None) -> bool:
+        """Pick a level from `sensors` and apply it to `state.model`. Returns True on change.
+
+        A needed model switch is only recorded in `pending_model_path`; the
+        async loop performs it via `switch_model` once the limiter drains.
+        """
+        self.sensors = sensors if sensors is not None else self.read_sensors()
+        level, reason = self.decide(self.sensors)
+        self.reason = reason
+        model = getattr(state, "model", None)
+        if self.base_model_path is None and getattr(model, "backend", None) == "llama-cpp":
+            self.base_model_path = model.model_path
+        if level == self.level and self.decisions_total:
+            return False
+
+        settings = self.settings_for(level)
+        target_path = self.base_model_path
+        if level == "low" and self.base_model_path:
+            target_path = find_fallback_model(self.manifest_path, self.base_model_path) or self.base_model_path
+        current_path = getattr(model, "model_path", None)
+        if target_path and model is not None and current_path != target_path:
+            self.pending_model_path = target_path
+        else:
+            self.pending_model_path = None
+        if model is not None and hasattr(model, "apply_runtime"):
+            model.apply_runtime(n_threads=settings["n_threads"], n_batch=settings["n_batch_target"])
+        self.limiter.set_limit(settings["max_concurrency"])
+
+        settings["model_path"] = self.pending_model_path or current_path
+        self.level = level
+        self.settings = settings
+        self.decisions_total += 1
+        self.history.append({"at": time.time(), "level": level, "reason": reason, **settings})
+        return True
+
+    async def switch_model(self, state: Any):
+        """Swap `state.model` to `pending_model_path` once no request is using it."""
+        target = self.pending_model_path
+        if not target:
+            return
+        async with self.limiter.exclusive():
+            old = state.model
+            if hasattr(old, "unload"):
+                await asyncio.to_thread(old.unload)
+            model = get_model(model_path=target)
+            if hasattr(model, "apply_runtime"):
+                model.apply_runtime(
+                    n_threads=self.settings["n_threads"], n_batch=self.settings["n_batch_target"]
+                )
+            state.model = model
+        self.pending_model_path = None
+
+    async def _loop(self, state: Any):
+        while True:
+            try:
+                sensors = await asyncio.to_thread(self.read_sensors)
+                self.step(state, sensors)
+                await self.switch_model(state)
+                self.last_error = None
+            except Exception as exc:
+                # Keep polling; a failed unload or runtime change must not stop the governor.
+                self.last_error = f"{exc.__class__.__name__}: {exc}"
+            await asyncio.sleep(self.interval)
+
+    def start(self, state: Any):
+        self._task = asyncio.create_task(self._loop(state))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def get_governor() -> Optional[Governor]:
+    """Return a governor configured from env, or None when `GOVERNOR_ENABLED=0`."""
+    if os.getenv("GOVERNOR_ENABLED", "1").lower() in ("0", "false", "no", "off"):
+        return None
+    return Governor(
+        threads=_env_int("MODEL_THREADS", 4),
+        n_batch=_env_int("MODEL_N_BATCH", 512),
+        max_concurrency=_env_int("MODEL_MAX_CONCURRENCY", 1),
+        temp_warm=_env_float("GOVERNOR_TEMP_WARM", 70.0),
+        temp_hot=_env_float("GOVERNOR_TEMP_HOT", 80.0),
+        hysteresis=_env_float("GOVERNOR_HYSTERESIS", 5.0),
+        battery_low=_env_int("GOVERNOR_BATTERY_LOW", 30),
+        battery_critical=_env_int("GOVERNOR_BATTERY_CRITICAL", 15),
+        interval=_env_float("GOVERNOR_INTERVAL", 5.0),
+        manifest_path=os.getenv("GOVERNOR_MANIFEST") or str(DEFAULT_MANIFEST),
+    )
+
+
+def get_limiter(governor: Optional[Governor]) -> ConcurrencyLimiter:
+    """Return the request limiter: the governor's, or a fixed `MODEL_MAX_CONCURRENCY` cap without one."""
+    if governor is not None:
+        return governor.limiter
+    return ConcurrencyLimiter(_env_int("MODEL_MAX_CONCURRENCY", 1))
+
+
+def applied_n_batch(model: Any) -> Optional[int]:
+    """Batch size the loaded model actually uses (None until it is loaded)."""
+    runtime = getattr(model, "runtime", None) or {}
+    return runtime.get("n_batch")
+
+
+def get_governor_status(governor: Optional[Governor], model: Any = None) -> Dict[str, Any]:
+    if governor is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "level": governor.level,
+        "reason": governor.reason,
+        "sensors": governor.sensors,
+        "settings": {**governor.settings, "n_batch_applied": applied_n_batch(model)},
+        "pending_model_path": governor.pending_model_path,
+        "active_requests": governor.limiter.active,
+        "decisions_total": governor.decisions_total,
+        "error": governor.last_error,
+        "recent_decisions": list(governor.history),
+    }
@@ -0,0 +1,220 @@
+from typing import Optional, Dict, Any, List, Tuple
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+from .model import _env_int, _env_float
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id);
+"""
+
+SYNC_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+_open_error: Optional[str] = None
+
+
+class ConversationStore:
+    """SQLite (WAL) conversation history with write-behind batching.
+
+    `append` only queues a message in memory, so the `/chat` path never waits
+    on disk. A background task flushes the queue every `flush_interval`
+    seconds (or sooner once `batch_size` messages are pending) in a single
+    transaction. With `synchronous=FULL` each batch costs one WAL fsync, and
+    committed batches survive power loss. Messages still queued at that
+    moment (at most one interval's worth) are lost.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 2.0,
+        batch_size: int = 64,
+        synchronous: str = "FULL",
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.synchronous = synchronous.upper() if synchronous.upper() in SYNC_MODES else "FULL"
+        self.last_error: Optional[str] = None
+        self.flushed = 0
+        self.dropped = 0
+        self.closed = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: List[Tuple[str, str, str, float]] = []
+        self._pending_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.executescript(SCHEMA)
+        self._conn = conn
+        return True
+
+    def append(self, conversation_id: str, role: str, content: str) -> bool:
+        """Queue a message. Returns False (and counts it as dropped) once the store is closed."""
+        with self._pending_lock:
+            if self.closed:
+                # e.g. a stream finishing in the threadpool during shutdown.
+                self.dropped += 1
+                self.last_error = "Store closed; message dropped"
+                return False
+            self._pending.append((conversation_id, role, content, time.time()))
+            full = len(self._pending) >= self.batch_size
+        if full and self._loop is not None:
+            # May be called from a threadpool (sync streaming generators).
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def pending_count(self) -> int:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write all queued messages in one transaction. Blocking; returns the count."""
+        # Take the batch under the DB lock so concurrent flushes commit in queue order.
+        with self._db_lock:
+            if self._conn is None:
+                return 0
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT INTO messages (conversation_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+                self._conn.execute("COMMIT")
+            except Exception as exc:
+                self.last_error = str(exc)
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                # Requeue ahead of newer messages so ordering is preserved.
+                with self._pending_lock:
+                    self._pending = batch + self._pending
+                raise
+            self.flushed += len(batch)
+        return len(batch)
+
+    def get_history(
+        self, conversation_id: str, limit: int = 50, before: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return one page of messages, oldest first, ending before message id `before`.
+
+        `next_before` is the cursor for the previous (older) page, or None.
+        """
+        query = "SELECT id, role, content, created_at FROM messages WHERE conversation_id = ?"
+        params: List[Any] = [conversation_id]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._db_lock:
+            rows = self._conn.execute(query, params).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        rows.reverse()
+        messages = [
+            {"id": row[0], "role": row[1], "content": row[2], "created_at": row[3]} for row in rows
+        ]
+        return {
+            "conversation_id": conversation_id,
+            "messages": messages,
+            "next_before": messages[0]["id"] if has_more and messages else None,
+        }
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception:
+                # `flush` recorded the error and requeued the batch; retry next tick.
+                pass
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        with self._pending_lock:
+            self.closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+        if self._conn is not None:
+            try:
+                await asyncio.to_thread(self.flush)
+            finally:
+                with self._db_lock:
+                    self._conn.close()
+                self._conn = None
+
+
+def get_store() -> Optional[ConversationStore]:
+    """Return an opened store configured from env, or None if history is disabled.
+
+    `HISTORY_DB_PATH` set to an empty string disables history. If the database
+    cannot be opened, the error is kept for `get_history_status`.
+    """
+    global _open_error
+    _open_error = None
+    path = os.getenv("HISTORY_DB_PATH", os.path.join("data", "history.db"))
+    if not path:
+        return None
+    store = ConversationStore(
+        path,
+        flush_interval=_env_float("HISTORY_FLUSH_INTERVAL", 2.0),
+        batch_size=_env_int("HISTORY_BATCH_SIZE", 64),
+        synchronous=os.getenv("HISTORY_SYNCHRONOUS", "FULL") or "FULL",
+    )
+    try:
+        store.open()
+    except Exception as exc:
+        _open_error = f"Failed to open {path}: {exc}"
+        return None
+    return store
+
+
+def get_history_status(store: Optional[ConversationStore]) -> Dict[str, Any]:
+    if store is None:
+        return {"enabled": False, "error": _open_error}
+    return {
+        "enabled": True,
+        "path": store.path,
+        "pending": store.pending_count(),
+        "flushed": store.flushed,
+        "dropped": store.dropped,
+        "error": store.last_error,
+    }
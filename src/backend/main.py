@@ -1,25 +1,47 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Query, Header
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, Iterable
+from typing import Optional, Iterable, AsyncIterator
 from pathlib import Path
+import asyncio
+import hmac
+import os
+import time
+import uuid
 
+from . import tracing
+from .governor import LEVELS, applied_n_batch, get_governor, get_governor_status, get_limiter
+from .history import get_store, get_history_status
 from .model import get_model, get_model_status
+from .profiler import get_profiler
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize model backend. Uses `MODEL_BACKEND` and `MODEL_PATH` env vars.
     model_path = None
     try:
-        import os
-
         model_path = os.getenv("MODEL_PATH")
     except Exception:
         model_path = None
 
+    tracing.configure()
     app.state.model = get_model(model_path=model_path)
+    app.state.history = get_store()
+    if app.state.history is not None:
+        app.state.history.start()
+    app.state.governor = get_governor()
+    # Caps concurrent requests even with the governor off.
+    app.state.limiter = get_limiter(app.state.governor)
+    if app.state.governor is not None:
+        app.state.governor.start(app.state)
     yield
+    if app.state.governor is not None:
+        await app.state.governor.close()
+    if app.state.history is not None:
+        await app.state.history.close()
+    tracing.close()
 
 
 app = FastAPI(title="Helios Vault Backend", version="0.1.0", lifespan=lifespan)
@@ -34,6 +56,27 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     reply: str
     model: str
+    conversation_id: Optional[str] = None
+
+
+def _conversation_id(req: ChatRequest) -> str:
+    return req.conversation_id or uuid.uuid4().hex
+
+
+async def _acquire_slot():
+    await app.state.limiter.acquire()
+
+
+async def _release_slot():
+    await app.state.limiter.release()
+
+
+async def _loop_lag_ms() -> float:
+    # Time for the event loop to get back to us: high values mean other
+    # work (e.g. a blocking generate call) is holding the loop.
+    start = time.perf_counter()
+    await asyncio.sleep(0)
+    return round((time.perf_counter() - start) * 1000, 3)
 
 
 @app.get("/")
@@ -50,35 +93,170 @@ async def status():
 
 @app.get("/health")
 async def health():
-    return {"healthy": True, "model": get_model_status(app.state.model)}
+    return {
+        "healthy": True,
+        "model": get_model_status(app.state.model),
+        "history": get_history_status(app.state.history),
+        "governor": get_governor_status(app.state.governor, app.state.model),
+        "tracing": tracing.get_tracing_status(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text-format gauges for the inference governor."""
+    governor = app.state.governor
+    lines = [f"helios_governor_enabled {int(governor is not None)}"]
+    if governor is not None:
+        sensors = governor.sensors
+        settings = governor.settings
+        values = {
+            "helios_governor_level": LEVELS.index(governor.level),
+            "helios_governor_decisions_total": governor.decisions_total,
+            "helios_governor_threads": settings["n_threads"],
+            "helios_governor_batch_size_target": settings["n_batch_target"],
+            "helios_governor_batch_size_applied": applied_n_batch(app.state.model),
+            "helios_governor_max_concurrency": settings["max_concurrency"],
+            "helios_governor_active_requests": governor.limiter.active,
+            "helios_governor_on_battery": int(bool(sensors.get("on_battery"))),
+            "helios_governor_temperature_celsius": sensors.get("temperature_c"),
+            "helios_governor_battery_capacity_percent": sensors.get("battery_capacity"),
+        }
+        for name, value in values.items():
+            if value is not None:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
 
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
-    model = app.state.model
-    if model is None:
+    if app.state.model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
-    try:
-        reply = model.generate(req.message)
-        return ChatResponse(reply=reply, model=model.name)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc)) from exc
+    conversation_id = _conversation_id(req)
+    history = app.state.history
+    with tracing.span("main.chat", conversation_id=conversation_id) as span:
+        if tracing.enabled():
+            span.set("loop_lag_ms", await _loop_lag_ms())
+        with tracing.span("main.wait_slot"):
+            await _acquire_slot()
+        try:
+            # Read after taking the slot: the governor may have swapped models meanwhile.
+            model = app.state.model
+            span.set("model", model.name)
+            # Off the event loop, so the governor and other requests keep running.
+            reply = await asyncio.to_thread(model.generate, req.message)
+        except Exception as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+        finally:
+            await _release_slot()
+        span.set("reply_chars", len(reply))
+    if history is not None:
+        history.append(conversation_id, "user", req.message)
+        history.append(conversation_id, "assistant", reply)
+    return ChatResponse(reply=reply, model=model.name, conversation_id=conversation_id)
 
 
 @app.post("/chat/stream")
 async def chat_stream(req: ChatRequest):
-    model = app.state.model
-    if model is None:
+    if app.state.model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
-    def iter_reply() -> Iterable[str]:
+    conversation_id = _conversation_id(req)
+    history = app.state.history
+
+    def iter_reply(model, root) -> Iterable[str]:
+        chunks = []
         try:
-            if hasattr(model, "generate_stream"):
-                for chunk in model.generate_stream(req.message):
+            with tracing.activate(root):
+                if hasattr(model, "generate_stream"):
+                    stream = model.generate_stream(req.message)
+                else:
+                    stream = iter([model.generate(req.message)])
+            try:
+                for chunk in stream:
+                    chunks.append(chunk)
                     yield chunk
-            else:
-                yield model.generate(req.message)
+            finally:
+                # Releases the model lock held by a llama stream.
+                if hasattr(stream, "close"):
+                    stream.close()
         except Exception as exc:
             yield f"[error] {exc}"
+            return
+        if history is not None:
+            history.append(conversation_id, "user", req.message)
+            history.append(conversation_id, "assistant", "".join(chunks))
+
+    async def iter_with_slot() -> AsyncIterator[str]:
+        # The slot and the root span are both taken here, not in the handler,
+        # so nothing leaks if the response is never iterated.
+        root = tracing.start_span("main.chat_stream", conversation_id=conversation_id)
+        chunks = 0
+        try:
+            if tracing.enabled():
+                root.set("loop_lag_ms", await _loop_lag_ms())
+            with tracing.activate(root), tracing.span("main.wait_slot"):
+                await _acquire_slot()
+            try:
+                model = app.state.model
+                root.set("model", model.name)
+                reply = iter_reply(model, root)
+                try:
+                    async for chunk in iterate_in_threadpool(reply):
+                        chunks += 1
+                        yield chunk
+                finally:
+                    # Close before giving the slot back, e.g. on client disconnect.
+                    try:
+                        reply.close()
+                    except ValueError:
+                        # Still running in the threadpool; finalized once that call returns.
+                        pass
+            finally:
+                await _release_slot()
+        finally:
+            root.set("chunks", chunks)
+            root.end()
 
-    return StreamingResponse(iter_reply(), media_type="text/plain")
+    return StreamingResponse(
+        iter_with_slot(), media_type="text/plain", headers={"X-Conversation-Id": conversation_id}
+    )
+
+
+@app.get("/conversations/{conversation_id}/messages")
+async def conversation_messages(
+    conversation_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None, ge=1),
+):
+    history = app.state.history
+    if history is None:
+        raise HTTPException(status_code=503, detail="History store not enabled")
+    # Reads are rare; flush queued writes first so a page includes the latest turn.
+    await asyncio.to_thread(history.flush)
+    return await asyncio.to_thread(history.get_history, conversation_id, limit, before)
+
+
+@app.post("/admin/profile", response_class=PlainTextResponse)
+async def admin_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval_ms: float = Query(10.0, ge=1, le=1000),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Sample all thread stacks for `seconds` under live load; returns folded stacks.
+
+    Feed the output to flamegraph.pl, inferno-flamegraph or speedscope.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=403, detail="Admin endpoints disabled (set ADMIN_TOKEN)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    profiler = get_profiler()
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        folded, samples = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000)
+    except RuntimeError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return PlainTextResponse(folded, headers={"X-Profile-Samples": str(samples)})
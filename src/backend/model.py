@@ -1,5 +1,9 @@
 from typing import Optional, Dict, Any, Iterable
 import os
+import threading
+import time
+
+from . import tracing
 
 
 class ModelStub:
@@ -14,6 +18,7 @@ class ModelStub:
         self.backend = "stub"
         self.loaded = False
         self.last_error = last_error
+        self.runtime: Dict[str, Any] = {}
 
     def load(self):
         # Placeholder for loading logic. No-op for stub.
@@ -33,6 +38,13 @@ class ModelStub:
         for idx in range(0, len(reply), chunk_size):
             yield reply[idx : idx + chunk_size]
 
+    def apply_runtime(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None):
+        # Nothing to tune for the stub; record the settings for status reporting.
+        if n_threads is not None:
+            self.runtime["n_threads"] = n_threads
+        if n_batch is not None:
+            self.runtime["n_batch"] = n_batch
+
 
 def _env_int(name: str, default: int) -> int:
     raw = os.getenv(name)
@@ -58,6 +70,7 @@ def _default_model_kwargs() -> Dict[str, Any]:
     return {
         "n_ctx": _env_int("MODEL_N_CTX", 2048),
         "n_threads": _env_int("MODEL_THREADS", 4),
+        "n_batch": _env_int("MODEL_N_BATCH", 512),
     }
 
 
@@ -71,6 +84,7 @@ def _default_gen_kwargs() -> Dict[str, Any]:
 # Optional llama-cpp-python wrapper. If the package is available at runtime,
 # `get_model` will return a wrapper around it; otherwise it returns `ModelStub`.
 try:
+    import llama_cpp  # type: ignore
     from llama_cpp import Llama  # type: ignore
 
     class LlamaCppModel:
@@ -95,29 +109,72 @@ try:
                 merged_gen_kwargs.update(gen_kwargs)
             self._gen_kwargs = merged_gen_kwargs
             self._llama = None
+            self._loaded_n_batch: Optional[int] = None
             self.loaded = False
             self.last_error = None
+            # `Llama` is not thread-safe (shared context, KV cache, n_tokens):
+            # one load or decode at a time. A plain Lock, not an RLock, because
+            # a stream may be resumed on a different threadpool thread.
+            self._lock = threading.Lock()
 
         def load(self):
+            with self._lock:
+                return self._load()
+
+        def _load(self):
             if not self.model_path:
                 err = "MODEL_PATH not provided for LlamaCppModel"
                 self.last_error = err
                 raise ValueError(err)
             try:
                 # Instantiate the underlying Llama model. This may require native libs.
-                self._llama = Llama(model_path=self.model_path, **self._model_kwargs)
+                with tracing.span("llama.load", model_path=self.model_path):
+                    self._llama = Llama(model_path=self.model_path, **self._model_kwargs)
+                self._loaded_n_batch = self._model_kwargs.get("n_batch")
                 self.loaded = True
                 return True
             except Exception as exc:
                 self.last_error = str(exc)
                 raise
 
+        def _trace_tokenize(self, prompt: str):
+            # Only pay for the extra tokenize pass when tracing is on.
+            if not tracing.enabled():
+                return
+            with tracing.span("llama.tokenize") as span:
+                span.set("prompt_tokens", len(self._llama.tokenize(prompt.encode("utf-8"))))
+
+        def _trace_phases(self, parent: Any, start_ns: int):
+            """Split the last call into prompt-eval and decode spans using llama.cpp perf counters."""
+            if not tracing.enabled():
+                return
+            try:
+                perf = llama_cpp.llama_perf_context(self._llama._ctx.ctx)
+            except Exception as exc:
+                # Older bindings lack perf counters; say so rather than dropping the phases silently.
+                parent.set("phases_unavailable", f"{exc.__class__.__name__}: {exc}")
+                return
+            prompt_end = start_ns + int(perf.t_p_eval_ms * 1e6)
+            parent.child("llama.prompt_eval", start_ns, prompt_end, tokens=perf.n_p_eval)
+            parent.child(
+                "llama.decode",
+                prompt_end,
+                prompt_end + int(perf.t_eval_ms * 1e6),
+                tokens=perf.n_eval,
+                tokens_per_sec=round(perf.n_eval / (perf.t_eval_ms / 1000), 2) if perf.t_eval_ms else None,
+            )
+
         def generate(self, prompt: str) -> str:
-            if self._llama is None:
-                # Lazy load
-                self.load()
-            # Use the simple call API — tweak as needed when integrating for real
-            out = self._llama(prompt, **self._gen_kwargs)
+            with tracing.span("llama.generate", n_threads=self._model_kwargs.get("n_threads")) as span:
+                with self._lock:
+                    if self._llama is None:
+                        # Lazy load
+                        self._load()
+                    self._trace_tokenize(prompt)
+                    start_ns = time.time_ns()
+                    # Use the simple call API — tweak as needed when integrating for real
+                    out = self._llama(prompt, **self._gen_kwargs)
+                    self._trace_phases(span, start_ns)
             # `out` structure depends on llama-cpp-python version; handle common case
             generated = getattr(out, "generations", None)
             if generated:
@@ -131,23 +188,85 @@ try:
             return str(out)
 
         def generate_stream(self, prompt: str) -> Iterable[str]:
+            # Capture the caller's span now: the generator body may run on
+            # other threads, where the current-span context is not carried over.
+            return self._generate_stream(prompt, tracing.current_span())
+
+        def _generate_stream(self, prompt: str, parent: Any) -> Iterable[str]:
+            span = tracing.start_span(
+                "llama.generate_stream", parent=parent, n_threads=self._model_kwargs.get("n_threads")
+            )
+            try:
+                # Held until the stream is exhausted or closed; the fallback
+                # below runs after it is released.
+                with self._lock:
+                    with tracing.activate(span):
+                        if self._llama is None:
+                            self._load()
+                        self._trace_tokenize(prompt)
+                    start_ns = time.time_ns()
+                    first_chunk = True
+                    stream = self._llama(prompt, stream=True, **self._gen_kwargs)
+                    for chunk in stream:
+                        if first_chunk:
+                            span.set("first_chunk_ms", round((time.time_ns() - start_ns) / 1e6, 3))
+                            first_chunk = False
+                        if isinstance(chunk, dict):
+                            choices = chunk.get("choices") or []
+                            if choices and isinstance(choices[0], dict):
+                                text = choices[0].get("text")
+                                if text:
+                                    yield text
+                                    continue
+                        text = str(chunk)
+                        if text:
+                            yield text
+                    self._trace_phases(span, start_ns)
+            except Exception:
+                with tracing.activate(span):
+                    reply = self.generate(prompt)
+                yield reply
+            finally:
+                span.end()
+
+        def apply_runtime(self, n_threads: Optional[int] = None, n_batch: Optional[int] = None):
+            """Adjust thread count live; `n_batch` only takes effect on the next load."""
+            if n_batch is not None:
+                self._model_kwargs["n_batch"] = n_batch
+            if n_threads is None:
+                return
+            self._model_kwargs["n_threads"] = n_threads
             if self._llama is None:
-                self.load()
+                return
+            self._llama.n_threads = n_threads
+            self._llama.n_threads_batch = n_threads
             try:
-                stream = self._llama(prompt, stream=True, **self._gen_kwargs)
-                for chunk in stream:
-                    if isinstance(chunk, dict):
-                        choices = chunk.get("choices") or []
-                        if choices and isinstance(choices[0], dict):
-                            text = choices[0].get("text")
-                            if text:
-                                yield text
-                                continue
-                    text = str(chunk)
-                    if text:
-                        yield text
+                llama_cpp.llama_set_n_threads(self._llama._ctx.ctx, n_threads, n_threads)
             except Exception:
-                yield self.generate(prompt)
+                # Older bindings read `n_threads` from the Llama object on each eval.
+                pass
+
+        def unload(self):
+            """Release the native model so its memory is freed before another loads.
+
+            Waits for a decode in progress to finish.
+            """
+            with self._lock:
+                llama, self._llama = self._llama, None
+                self._loaded_n_batch = None
+                self.loaded = False
+                if llama is not None and hasattr(llama, "close"):
+                    llama.close()
+
+        @property
+        def runtime(self) -> Dict[str, Any]:
+            # `n_batch` is what the loaded context uses; `n_batch_pending` is
+            # what the next load will use.
+            return {
+                "n_threads": self._model_kwargs.get("n_threads"),
+                "n_batch": self._loaded_n_batch,
+                "n_batch_pending": self._model_kwargs.get("n_batch"),
+            }
 
 except Exception:
     LlamaCppModel = None  # type: ignore
@@ -155,6 +274,14 @@ except Exception:
 
 def get_model(model_path: Optional[str] = None):
     """Return a model instance. Prefers LlamaCppModel when available, otherwise ModelStub."""
+    with tracing.span("get_model") as span:
+        model = _select_model(model_path)
+        span.set("backend", getattr(model, "backend", None))
+        span.set("model_path", getattr(model, "model_path", None))
+        return model
+
+
+def _select_model(model_path: Optional[str] = None):
     # Prefer explicit env selection if provided
     preferred = os.getenv("MODEL_BACKEND", "auto").lower()
     if preferred == "stub":
@@ -194,4 +321,5 @@ def get_model_status(model: Any) -> Dict[str, Any]:
         "loaded": bool(getattr(model, "loaded", False)),
         "error": getattr(model, "last_error", None),
         "model_path": getattr(model, "model_path", None),
+        "runtime": getattr(model, "runtime", None),
     }
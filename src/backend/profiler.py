@@ -0,0 +1,84 @@
+from typing import Optional, Dict, Tuple, Counter as CounterType
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """In-process sampling profiler producing py-spy-style folded stacks.
+
+    Every `interval` seconds it snapshots the Python stack of every thread
+    (except its own) via `sys._current_frames()`. Identical stacks are
+    counted, and the result is rendered as `thread;frame;frame count` lines.
+    That is the input format of flamegraph.pl, inferno and speedscope. Native
+    frames (llama.cpp) show up as time spent in the Python call that entered
+    them.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: CounterType[str] = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+    def _sample(self, names: Dict[int, str], own_ident: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float, interval: Optional[float] = None) -> Tuple[str, int]:
+        """Sample for `seconds` (blocking); return folded stacks and the sample count.
+
+        Both come from this run; reading `samples` afterwards could already
+        describe a newer one.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            if interval is not None:
+                self.interval = interval
+            self.samples = 0
+            self.stacks = Counter()
+            own_ident = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self._sample(names, own_ident)
+                time.sleep(self.interval)
+            return self.folded(), self.samples
+        finally:
+            self._lock.release()
+
+    def folded(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
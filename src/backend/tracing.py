@@ -0,0 +1,222 @@
+from typing import Optional, Dict, Any, Iterator
+from contextlib import contextmanager
+import contextvars
+import json
+import os
+import threading
+import time
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("helios_current_span", default=None)
+_tracer: Optional["Tracer"] = None
+
+
+class Span:
+    """A single timed operation. Call `end()` (or use `span()`) to record it."""
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def child(self, name: str, start_ns: int, end_ns: int, **attributes: Any) -> "Span":
+        """Record an already-finished child span, e.g. from native timing counters."""
+        span = Span(self.tracer, name, self, attributes)
+        span.start_ns = start_ns
+        span.end(end_ns)
+        return span
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self.tracer.write(self)
+
+
+class _NoopSpan:
+    trace_id = None
+    span_id = None
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def child(self, name: str, start_ns: int, end_ns: int, **attributes: Any) -> "_NoopSpan":
+        return self
+
+    def end(self, end_ns: Optional[int] = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Appends finished spans to a local file, one JSON document per line.
+
+    `jsonl` writes one flat record per span. `otlp` writes OTLP/JSON
+    `resourceSpans` documents, the format of the OpenTelemetry Collector file
+    exporter, so traces can be replayed into any OTel backend later.
+    """
+
+    def __init__(self, path: str, fmt: str = "jsonl", service_name: str = "helios-vault"):
+        self.path = path
+        self.fmt = fmt if fmt in ("jsonl", "otlp") else "jsonl"
+        self.service_name = service_name
+        self.spans_written = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Line-buffered: one write per span, no fsync.
+        self._handle = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _record(self, span: Span) -> Dict[str, Any]:
+        if self.fmt == "jsonl":
+            return {
+                "trace_id": span.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "start_ns": span.start_ns,
+                "end_ns": span.end_ns,
+                "duration_ms": round((span.end_ns - span.start_ns) / 1e6, 3),
+                "attributes": span.attributes,
+                "error": span.error,
+            }
+        otlp_span = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items() if v is not None
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]
+                    },
+                    "scopeSpans": [{"scope": {"name": "helios-vault"}, "spans": [otlp_span]}],
+                }
+            ]
+        }
+
+    def write(self, span: Span):
+        line = json.dumps(self._record(span), default=str)
+        with self._lock:
+            try:
+                self._handle.write(line + "\n")
+                self.spans_written += 1
+            except Exception as exc:
+                self.last_error = str(exc)
+
+    def close(self):
+        with self._lock:
+            self._handle.close()
+
+
+def configure() -> Optional[Tracer]:
+    """Enable tracing from env. `TRACE_PATH` empty or unset disables it."""
+    global _tracer
+    close()
+    path = os.getenv("TRACE_PATH")
+    if not path:
+        return None
+    _tracer = Tracer(path, fmt=(os.getenv("TRACE_FORMAT") or "jsonl").lower())
+    return _tracer
+
+
+def close():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes: Any):
+    """Start a span without making it current. Parent defaults to the current span.
+
+    Use this for spans that outlive one call, e.g. across generator yields.
+    """
+    if _tracer is None:
+        return NOOP_SPAN
+    if parent is None:
+        parent = _current.get()
+    if parent is NOOP_SPAN:
+        parent = None
+    return Span(_tracer, name, parent, attributes)
+
+
+@contextmanager
+def activate(span: Any) -> Iterator[Any]:
+    """Make `span` the current span (parent for new spans) inside the block."""
+    token = _current.set(span if span is not NOOP_SPAN else None)
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time the block as a child of the current span. No-op when tracing is off."""
+    if _tracer is None:
+        yield NOOP_SPAN
+        return
+    current = start_span(name, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{exc.__class__.__name__}: {exc}"
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+def get_tracing_status() -> Dict[str, Any]:
+    if _tracer is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "path": _tracer.path,
+        "format": _tracer.fmt,
+        "spans_written": _tracer.spans_written,
+        "error": _tracer.last_error,
+    }
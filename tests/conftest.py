@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_history_db(monkeypatch, tmp_path):
+    # Keep app startup from creating data/history.db in the working tree.
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
@@ -0,0 +1,63 @@
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS = os.path.join(ROOT, "scripts")
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+import fetch_models
+
+
+ENTRY = {
+    "id": "demo",
+    "tier": 0,
+    "name": "Demo",
+    "repo": "org/demo-GGUF",
+    "file": "demo.Q4_K_M.gguf",
+    "quant": "Q4_K_M",
+    "optional": False,
+    "variants": [
+        {"quant": "Q2_K", "file": "demo.Q2_K.gguf", "size_gb": 1.0, "ram_gb": None, "tokens_per_sec": None, "sha256": None},
+        {"quant": "Q4_K_M", "file": "demo.Q4_K_M.gguf", "size_gb": 2.0, "ram_gb": None, "tokens_per_sec": None, "sha256": "abc"},
+        {"quant": "Q6_K", "file": "demo.Q6_K.gguf", "size_gb": 3.0, "ram_gb": 3.2, "tokens_per_sec": 4.0, "sha256": None},
+    ],
+}
+
+
+def test_choose_variant_explicit_quant():
+    resolved = fetch_models.choose_variant(ENTRY, quant="q2_k")
+    assert resolved["file"] == "demo.Q2_K.gguf"
+    assert resolved["quant"] == "Q2_K"
+    assert fetch_models.choose_variant(ENTRY, quant="Q8_0") is None
+
+
+def test_choose_variant_by_ram():
+    assert fetch_models.choose_variant(ENTRY, ram_gb=2.0)["quant"] == "Q2_K"
+    assert fetch_models.choose_variant(ENTRY, ram_gb=3.5)["quant"] == "Q4_K_M"
+    assert fetch_models.choose_variant(ENTRY, ram_gb=16.0)["quant"] == "Q6_K"
+    # Nothing fits: fall back to the smallest variant.
+    assert fetch_models.choose_variant(ENTRY, ram_gb=0.5)["quant"] == "Q2_K"
+
+
+def test_choose_variant_min_tps_and_urls():
+    resolved = fetch_models.choose_variant(ENTRY, ram_gb=16.0, min_tps=5.0)
+    assert resolved["quant"] == "Q4_K_M"
+    assert resolved["sha256"] == "abc"
+    urls = fetch_models.get_urls(resolved)
+    assert urls == ["https://huggingface.co/org/demo-GGUF/resolve/main/demo.Q4_K_M.gguf"]
+
+
+def test_choose_variant_without_variants():
+    entry = {"id": "plain", "file": "plain.Q4_K_M.gguf", "quant": "Q4_K_M"}
+    assert fetch_models.choose_variant(entry, ram_gb=1.0) is entry
+    assert fetch_models.choose_variant(entry, quant="q4_k_m") is entry
+    assert fetch_models.choose_variant(entry, quant="Q6_K") is None
+
+
+def test_choose_variant_skips_local_variants():
+    entry = dict(ENTRY)
+    local = {"quant": "Q6_K", "file": "demo.Q6_K-local.gguf", "size_gb": 0.1, "ram_gb": None, "tokens_per_sec": None, "sha256": "x", "local": True}
+    entry["variants"] = [local] + ENTRY["variants"]
+    assert fetch_models.choose_variant(entry, quant="Q6_K")["file"] == "demo.Q6_K.gguf"
+    assert fetch_models.choose_variant(entry, ram_gb=2.0)["quant"] == "Q2_K"
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.backend.governor import (
+    ConcurrencyLimiter,
+    Governor,
+    find_fallback_model,
+    get_governor_status,
+    read_power,
+    read_thermal,
+)
+from src.backend.main import app
+from src.backend.model import ModelStub
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _sysfs(tmp_path, temp_c=None, battery=None):
+    thermal = tmp_path / "thermal"
+    power = tmp_path / "power_supply"
+    thermal.mkdir(exist_ok=True)
+    power.mkdir(exist_ok=True)
+    if temp_c is not None:
+        _write(thermal / "thermal_zone0" / "temp", str(int(temp_c * 1000)))
+        _write(thermal / "thermal_zone1" / "temp", "30000")
+    if battery is not None:
+        status, capacity = battery
+        _write(power / "BAT0" / "type", "Battery")
+        _write(power / "BAT0" / "status", status)
+        _write(power / "BAT0" / "capacity", str(capacity))
+    return str(thermal), str(power)
+
+
+def test_read_sensors(tmp_path):
+    thermal, power = _sysfs(tmp_path, temp_c=65.5, battery=("Discharging", 42))
+    assert read_thermal(thermal) == 65.5
+    assert read_power(power) == {"on_battery": True, "battery_capacity": 42}
+    assert read_thermal(str(tmp_path / "missing")) is None
+
+
+def test_governor_levels_and_hysteresis(tmp_path):
+    thermal, power = _sysfs(tmp_path)
+    governor = Governor(threads=8, n_batch=512, max_concurrency=4, thermal_root=thermal, power_root=power)
+    state = SimpleNamespace(model=ModelStub())
+
+    assert governor.step(state, {"temperature_c": 50.0, "on_battery": False, "battery_capacity": None})
+    assert governor.level == "normal"
+    assert state.model.runtime["n_threads"] == 8
+
+    assert governor.step(state, {"temperature_c": 85.0, "on_battery": False, "battery_capacity": None})
+    assert governor.level == "low"
+    assert governor.settings["n_threads"] == 2
+    assert governor.limiter.limit == 1
+
+    # Below the hot threshold but within hysteresis: stay low.
+    assert not governor.step(state, {"temperature_c": 78.0, "on_battery": False, "battery_capacity": None})
+    assert governor.level == "low"
+
+    assert governor.step(state, {"temperature_c": 50.0, "on_battery": True, "battery_capacity": 80})
+    assert governor.level == "reduced"
+    assert governor.settings == {
+        "n_threads": 4,
+        "n_batch_target": 256,
+        "max_concurrency": 2,
+        "model_path": state.model.model_path,
+    }
+    assert governor.decisions_total == 3
+    assert [d["level"] for d in governor.history] == ["normal", "low", "reduced"]
+
+
+def test_find_fallback_model(tmp_path):
+    manifest = {
+        "models": [
+            {"id": "small", "tier": 0, "file": "small.Q4_K_M.gguf", "variants": [{"quant": "Q2_K", "file": "small.Q2_K.gguf", "size_gb": 0.5}]},
+            {"id": "big", "tier": 1, "file": "big.Q4_K_M.gguf"},
+        ]
+    }
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    (tmp_path / "big.Q4_K_M.gguf").write_text("")
+    assert find_fallback_model(str(manifest_path), str(tmp_path / "big.Q4_K_M.gguf")) is None
+    (tmp_path / "small.Q2_K.gguf").write_text("")
+    fallback = find_fallback_model(str(manifest_path), str(tmp_path / "big.Q4_K_M.gguf"))
+    assert fallback == str(tmp_path / "small.Q2_K.gguf")
+
+
+def test_limiter_raise_and_exclusive():
+    async def scenario():
+        limiter = ConcurrencyLimiter(1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        limiter.set_limit(2)
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.active == 2
+
+        drained = asyncio.Event()
+
+        async def drain():
+            async with limiter.exclusive():
+                drained.set()
+                await asyncio.sleep(0.01)
+
+        drainer = asyncio.create_task(drain())
+        newcomer = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        assert not drained.is_set() and not newcomer.done()
+        await limiter.release()
+        await limiter.release()
+        await asyncio.wait_for(drainer, 1)
+        await asyncio.wait_for(newcomer, 1)
+        assert limiter.active == 1
+
+    asyncio.run(scenario())
+
+
+class _FakeLlama(ModelStub):
+    def __init__(self, model_path=None):
+        super().__init__(model_path=model_path)
+        self.backend = "llama-cpp"
+        self.unloaded = False
+
+    def unload(self):
+        self.unloaded = True
+
+
+def test_model_switch_waits_for_in_flight_requests(monkeypatch, tmp_path):
+    from src.backend import governor as governor_mod
+
+    manifest = {
+        "models": [
+            {"id": "small", "tier": 0, "file": "small.gguf"},
+            {"id": "big", "tier": 1, "file": "big.gguf"},
+        ]
+    }
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    (tmp_path / "big.gguf").write_text("")
+    (tmp_path / "small.gguf").write_text("")
+    monkeypatch.setattr(governor_mod, "get_model", lambda model_path=None: _FakeLlama(model_path))
+
+    async def scenario():
+        governor = Governor(manifest_path=str(manifest_path))
+        old = _FakeLlama(str(tmp_path / "big.gguf"))
+        state = SimpleNamespace(model=old)
+        await governor.limiter.acquire()  # an in-flight request
+        governor.step(state, {"temperature_c": 90.0, "on_battery": False, "battery_capacity": None})
+        assert governor.pending_model_path == str(tmp_path / "small.gguf")
+        assert state.model is old
+
+        switch = asyncio.create_task(governor.switch_model(state))
+        await asyncio.sleep(0.01)
+        assert state.model is old and not old.unloaded
+        await governor.limiter.release()
+        await asyncio.wait_for(switch, 1)
+        assert old.unloaded
+        assert state.model.model_path == str(tmp_path / "small.gguf")
+        assert governor.pending_model_path is None
+
+        status = get_governor_status(governor, state.model)
+        assert status["settings"]["n_batch_target"] == 128
+        assert status["settings"]["n_batch_applied"] == 128
+
+    asyncio.run(scenario())
+
+
+def test_governor_health_and_metrics(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.delenv("GOVERNOR_ENABLED", raising=False)
+    with TestClient(app) as client:
+        status = client.get("/health").json()["governor"]
+        assert status["enabled"] is True
+        assert status["level"] in ("normal", "reduced", "low")
+        assert "n_threads" in status["settings"]
+
+        r = client.get("/metrics")
+        assert r.status_code == 200
+        assert "helios_governor_enabled 1" in r.text
+        assert "helios_governor_threads" in r.text
+        assert "helios_governor_batch_size_target" in r.text
+
+
+def test_stream_slot_only_taken_while_iterating():
+    from src.backend import main as main_mod
+
+    governor = Governor(max_concurrency=1)
+    app.state.model = ModelStub()
+    app.state.history = None
+    app.state.governor = governor
+    app.state.limiter = governor.limiter
+
+    async def scenario():
+        response = await main_mod.chat_stream(main_mod.ChatRequest(message="hi"))
+        # Never iterated (e.g. the client went away): no slot is held.
+        assert governor.limiter.active == 0
+        chunks = [chunk async for chunk in response.body_iterator]
+        assert "hi" in "".join(chunks)
+        assert governor.limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+class _OverlapModel(ModelStub):
+    def __init__(self):
+        super().__init__()
+        self.active = 0
+        self.max_active = 0
+
+    def generate(self, prompt):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        self.active -= 1
+        return super().generate(prompt)
+
+
+def test_concurrency_capped_without_governor(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.setenv("GOVERNOR_ENABLED", "0")
+    monkeypatch.delenv("MODEL_MAX_CONCURRENCY", raising=False)
+    with TestClient(app) as client:
+        model = _OverlapModel()
+        client.app.state.model = model
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            responses = list(pool.map(lambda idx: client.post("/chat", json={"message": str(idx)}), range(6)))
+        assert all(r.status_code == 200 for r in responses)
+        assert client.app.state.governor is None
+        assert model.max_active == 1
+
+
+def test_governor_loop_survives_errors(tmp_path):
+    thermal, power = _sysfs(tmp_path, temp_c=50.0)
+
+    class Broken(ModelStub):
+        def apply_runtime(self, **kwargs):
+            raise RuntimeError("boom")
+
+    async def scenario():
+        governor = Governor(interval=0.01, thermal_root=thermal, power_root=power)
+        state = SimpleNamespace(model=Broken())
+        governor.start(state)
+        await asyncio.sleep(0.05)
+        assert not governor._task.done()
+        assert "boom" in get_governor_status(governor)["error"]
+
+        state.model = ModelStub()
+        await asyncio.sleep(0.05)
+        assert get_governor_status(governor)["error"] is None
+        assert governor.decisions_total == 1
+        await governor.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.backend.history import ConversationStore
+from src.backend.main import app
+
+
+def test_store_batches_and_paginates(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    store.open()
+    for idx in range(5):
+        store.append("c1", "user", f"msg {idx}")
+    store.append("c2", "user", "other")
+    assert store.pending_count() == 6
+
+    assert store.flush() == 6
+    assert store.pending_count() == 0
+
+    page = store.get_history("c1", limit=2)
+    assert [m["content"] for m in page["messages"]] == ["msg 3", "msg 4"]
+    assert page["next_before"] is not None
+
+    older = store.get_history("c1", limit=10, before=page["next_before"])
+    assert [m["content"] for m in older["messages"]] == ["msg 0", "msg 1", "msg 2"]
+    assert older["next_before"] is None
+
+    mode = store._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode.lower() == "wal"
+
+
+def test_chat_history_endpoint(monkeypatch, tmp_path):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.setenv("HISTORY_DB_PATH", str(tmp_path / "history.db"))
+    with TestClient(app) as client:
+        r = client.post("/chat", json={"message": "first"})
+        assert r.status_code == 200
+        conversation_id = r.json()["conversation_id"]
+        assert conversation_id
+
+        with client.stream(
+            "POST", "/chat/stream", json={"message": "second", "conversation_id": conversation_id}
+        ) as r:
+            assert r.headers["x-conversation-id"] == conversation_id
+            "".join(r.iter_text())
+
+        r = client.get(f"/conversations/{conversation_id}/messages")
+        assert r.status_code == 200
+        messages = r.json()["messages"]
+        assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant"]
+        assert messages[2]["content"] == "second"
+        assert "second" in messages[3]["content"]
+
+        health = client.get("/health").json()
+        assert health["history"]["enabled"] is True
+
+
+def test_history_disabled(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.setenv("HISTORY_DB_PATH", "")
+    with TestClient(app) as client:
+        r = client.post("/chat", json={"message": "hi"})
+        assert r.status_code == 200
+        assert client.get("/conversations/x/messages").status_code == 503
+        assert client.get("/health").json()["history"] == {"enabled": False, "error": None}
+
+
+def test_history_open_failure_is_reported(monkeypatch, tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.setenv("HISTORY_DB_PATH", str(blocker / "history.db"))
+    with TestClient(app) as client:
+        status = client.get("/health").json()["history"]
+        assert status["enabled"] is False
+        assert "Failed to open" in status["error"]
+
+
+class _SlowFirstLock:
+    """Delays the first acquisition, widening the window between two flushes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._first = True
+
+    def __enter__(self):
+        if self._first:
+            self._first = False
+            time.sleep(0.2)
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def test_concurrent_flushes_keep_queue_order(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    store.open()
+    store._db_lock = _SlowFirstLock()
+
+    store.append("c1", "user", "first")
+    slow = threading.Thread(target=store.flush)
+    slow.start()
+    time.sleep(0.05)
+    store.append("c1", "assistant", "second")
+    fast = threading.Thread(target=store.flush)
+    fast.start()
+    slow.join()
+    fast.join()
+
+    page = store.get_history("c1")
+    assert [m["content"] for m in page["messages"]] == ["first", "second"]
+
+
+def test_append_after_close_is_dropped(tmp_path):
+    store = ConversationStore(str(tmp_path / "history.db"))
+    store.open()
+    store.append("c1", "user", "kept")
+    asyncio.run(store.close())
+
+    assert store.append("c1", "assistant", "late") is False
+    assert store.flush() == 0
+    assert store.dropped == 1
+
+    reopened = ConversationStore(str(tmp_path / "history.db"))
+    reopened.open()
+    assert [m["content"] for m in reopened.get_history("c1")["messages"]] == ["kept"]
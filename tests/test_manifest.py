@@ -20,3 +20,21 @@ def test_models_manifest_structure():
         has_repo = bool(entry.get("repo") and entry.get("file"))
         has_url = bool(entry.get("url"))
         assert has_repo or has_url
+
+
+def test_models_manifest_variants():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    manifest_path = os.path.join(root, "models_manifest.json")
+    with open(manifest_path, "r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+
+    variant_fields = {"quant", "file", "size_gb", "ram_gb", "tokens_per_sec", "sha256"}
+    for entry in manifest["models"]:
+        variants = entry.get("variants") or []
+        keys = [(variant["quant"], bool(variant.get("local"))) for variant in variants]
+        assert len(keys) == len(set(keys))
+        for variant in variants:
+            assert variant_fields.issubset(variant.keys())
+            assert variant["file"]
+        if variants:
+            assert entry["file"] in [variant["file"] for variant in variants]
@@ -1,7 +1,11 @@
 import os
 import sys
+import threading
+import time
+import types
 
 import importlib
+import importlib.util
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
@@ -42,3 +46,75 @@ def test_app_startup_initializes_model(monkeypatch):
         # exercise generate with a short input
         out = m.generate("hello")
         assert isinstance(out, str)
+
+
+def _load_with_fake_llama(monkeypatch):
+    """Import a private copy of the model module against a fake `llama_cpp`."""
+    stats = {"loads": 0, "active": 0, "max_active": 0}
+    guard = threading.Lock()
+
+    class FakeLlama:
+        def __init__(self, model_path=None, **kwargs):
+            with guard:
+                stats["loads"] += 1
+            time.sleep(0.02)
+
+        def _enter(self):
+            with guard:
+                stats["active"] += 1
+                stats["max_active"] = max(stats["max_active"], stats["active"])
+
+        def _exit(self):
+            with guard:
+                stats["active"] -= 1
+
+        def __call__(self, prompt, stream=False, **kwargs):
+            if stream:
+                return self._stream(prompt)
+            self._enter()
+            time.sleep(0.02)
+            self._exit()
+            return prompt
+
+        def _stream(self, prompt):
+            self._enter()
+            try:
+                for word in prompt.split():
+                    time.sleep(0.01)
+                    yield {"choices": [{"text": word}]}
+            finally:
+                self._exit()
+
+    fake = types.ModuleType("llama_cpp")
+    fake.Llama = FakeLlama
+    monkeypatch.setitem(sys.modules, "llama_cpp", fake)
+    spec = importlib.util.spec_from_file_location("src.backend._model_fake_llama", model_mod.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, stats
+
+
+def test_llama_model_serializes_load_and_decode(monkeypatch):
+    module, stats = _load_with_fake_llama(monkeypatch)
+    model = module.LlamaCppModel(model_path="fake.gguf")
+
+    def worker(idx):
+        if idx % 2:
+            list(model.generate_stream("one two three"))
+        else:
+            model.generate("hello")
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stats["loads"] == 1
+    assert stats["max_active"] == 1
+
+    # Closing a stream part-way releases the model for the next caller.
+    stream = model.generate_stream("a b c")
+    next(stream)
+    stream.close()
+    assert model.generate("again") == "again"
@@ -0,0 +1,68 @@
+import copy
+import json
+import os
+import stat
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTS = os.path.join(ROOT, "scripts")
+if SCRIPTS not in sys.path:
+    sys.path.insert(0, SCRIPTS)
+
+import fetch_models
+import requantize_models
+
+
+def _fake_quantize_bin(tmp_path):
+    # Called as: llama-quantize --allow-requantize SRC DST TYPE [THREADS]
+    path = tmp_path / "llama-quantize"
+    path.write_text('#!/bin/sh\necho "requantized $4" > "$3"\n')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_requantize_into_listed_quant_keeps_upstream_variant(tmp_path, monkeypatch):
+    with open(os.path.join(ROOT, "models_manifest.json"), "r", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(manifest))
+    models_dir = tmp_path / "models"
+    models_dir.mkdir()
+    (models_dir / "tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf").write_text("source")
+    upstream_before = copy.deepcopy(
+        next(v for v in manifest["models"][0]["variants"] if v["quant"] == "Q3_K_M")
+    )
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "requantize_models.py",
+            "--manifest",
+            str(manifest_path),
+            "--models-dir",
+            str(models_dir),
+            "--model",
+            "tinyllama-1.1b-q4",
+            "--quant",
+            "Q3_K_M",
+            "--quantize-bin",
+            _fake_quantize_bin(tmp_path),
+        ],
+    )
+    assert requantize_models.main() == 0
+
+    entry = json.loads(manifest_path.read_text())["models"][0]
+    q3 = [v for v in entry["variants"] if v["quant"] == "Q3_K_M"]
+    upstream = [v for v in q3 if not v.get("local")]
+    local = [v for v in q3 if v.get("local")]
+    assert upstream == [upstream_before]
+    assert len(local) == 1
+    assert local[0]["file"] == "tinyllama-1.1b-chat-v1.0.Q3_K_M-local.gguf"
+    assert (models_dir / local[0]["file"]).exists()
+    assert local[0]["sha256"] and local[0]["sha256"] != upstream_before["sha256"]
+
+    resolved = fetch_models.choose_variant(entry, quant="Q3_K_M")
+    assert resolved["file"] == upstream_before["file"]
+    assert resolved["sha256"] == upstream_before["sha256"]
+    assert fetch_models.choose_variant(entry, ram_gb=1.35)["file"] == upstream_before["file"]
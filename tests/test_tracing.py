@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src.backend import tracing
+from src.backend.main import app
+from src.backend.profiler import SamplingProfiler
+
+
+def _read_lines(path):
+    with open(path, "r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def test_chat_writes_jsonl_spans(monkeypatch, tmp_path):
+    trace_path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.setenv("TRACE_PATH", str(trace_path))
+    monkeypatch.delenv("TRACE_FORMAT", raising=False)
+    with TestClient(app) as client:
+        assert client.post("/chat", json={"message": "trace me"}).status_code == 200
+        with client.stream("POST", "/chat/stream", json={"message": "stream me"}) as r:
+            "".join(r.iter_text())
+        assert client.get("/health").json()["tracing"]["enabled"] is True
+    assert not tracing.enabled()
+
+    spans = _read_lines(trace_path)
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+    assert "get_model" in by_name
+    chat = by_name["main.chat"][0]
+    wait = [s for s in by_name["main.wait_slot"] if s["parent_id"] == chat["span_id"]]
+    assert wait and wait[0]["trace_id"] == chat["trace_id"]
+    assert chat["attributes"]["reply_chars"] > 0
+    assert "loop_lag_ms" in chat["attributes"]
+    assert by_name["main.chat_stream"][0]["attributes"]["chunks"] > 0
+
+
+def test_otlp_format(tmp_path):
+    tracer = tracing.Tracer(str(tmp_path / "traces.otlp.jsonl"), fmt="otlp")
+    parent = tracing.Span(tracer, "parent", None, {"n": 1})
+    parent.child("child", parent.start_ns, parent.start_ns + 1000, tokens=5)
+    parent.end()
+    tracer.close()
+
+    child, root = _read_lines(tmp_path / "traces.otlp.jsonl")
+    otlp_child = child["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    otlp_root = root["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert otlp_child["parentSpanId"] == otlp_root["spanId"]
+    assert otlp_child["traceId"] == otlp_root["traceId"]
+    assert otlp_child["attributes"] == [{"key": "tokens", "value": {"intValue": "5"}}]
+    assert "parentSpanId" not in otlp_root
+
+
+def test_sampling_profiler_folded_output():
+    profiler = SamplingProfiler(interval=0.001)
+    folded, samples = profiler.run(0.05)
+    assert samples > 0 and samples == profiler.samples
+    for line in folded.strip().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert ";" in stack
+
+
+def test_admin_profile_endpoint(monkeypatch):
+    monkeypatch.setenv("MODEL_BACKEND", "stub")
+    monkeypatch.delenv("MODEL_PATH", raising=False)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    with TestClient(app) as client:
+        assert client.post("/admin/profile?seconds=0.05").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    with TestClient(app) as client:
+        r = client.post("/admin/profile?seconds=0.05", headers={"X-Admin-Token": "wrong"})
+        assert r.status_code == 401
+        r = client.post("/admin/profile?seconds=0.05&interval_ms=5", headers={"X-Admin-Token": "secret"})
+        assert r.status_code == 200
+        assert int(r.headers["x-profile-samples"]) > 0
+        assert "text/plain" in r.headers["content-type"]